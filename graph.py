@@ -2,7 +2,9 @@ from os import listdir
 from os.path import isfile, join
 from PIL import Image
 from queue import PriorityQueue
-from typing import Any, List, Tuple
+from typing import Any, Iterator, List, Optional, Tuple
+from collections import deque
+from array import array
 import heapq
 
 
@@ -12,10 +14,11 @@ class Graph:
     self.num_nodes = 0
     self.num_edges = 0
     self.adj = {}
+    self.index = {}
 
   def add_node(self, node: Any) -> None:
     """
-    Adds a node to the graph.
+    Adds a node to the graph and assigns it the next integer ID in 'index'.
 
     Parameters:
         node (Any): The node to be added (as a key to a dict)
@@ -25,6 +28,7 @@ class Graph:
         return
     except KeyError:
       self.adj[node] = {}
+      self.index[node] = self.num_nodes
       self.num_nodes += 1
       
   def add_nodes(self, nodes: List[Any]) -> None:
@@ -251,82 +255,100 @@ class Graph:
       for v in self.adj[u]:
         self.adj[u][v] = (self.adj[u][v] - smallest_weight) / (highest_weight - smallest_weight)
 
-  def bfs(self, s: Any) -> List[Any]:
+  def bfs(self, s: Any, max_depth: Optional[int] = None) -> Iterator[Any]:
     """
     Perform Breadth-First Search (BFS) starting from the specified source node.
 
     Parameters:
     - s: The source node for the BFS traversal.
+    - max_depth: Optional limit on the number of edges between 's' and the yielded nodes.
 
-    This function explores the graph in breadth-first order starting from the given source node 's'.
+    This function lazily yields the nodes in breadth-first order starting from the given source node 's'.
     """
-    desc = {}
-    for node in self.adj:
-      desc[node] = 0
-    Q = [s]
-    R = [s]
-    desc[s] = 1
-    while len(Q) > 0:
-      u = Q.pop(0)
+    visited = bytearray(self.num_nodes)
+    visited[self.index[s]] = 1
+    Q = deque([(s, 0)])
+    yield s
+    while Q:
+      u, depth = Q.popleft()
+      if max_depth is not None and depth >= max_depth:
+        continue
       for v in self.adj[u]:
-        if desc[v] == 0:
-          desc[v] = 1
-          Q.append(v)
-          R.append(v)
-    return R
+        if not visited[self.index[v]]:
+          visited[self.index[v]] = 1
+          Q.append((v, depth + 1))
+          yield v
 
-  def dfs(self, s: Any) -> List[Any]:
+  def dfs(self, s: Any, max_depth: Optional[int] = None) -> Iterator[Any]:
     """
     Perform Depth-First Search (DFS) starting from the specified source node.
 
     Parameters:
     - s: The source node for the DFS traversal.
-
-    This function explores the graph in depth-first order starting from the given source node 's'.
-    """
-    desc = {}
-    for node in self.adj:
-      desc[node] = 0
-    S = [s]
-    R = [s]
-    desc[s] = 1
-    while len(S) > 0:
-      u = S[-1]
-      unvisited_neighbor = None
-      for v in self.adj[u]:
-        if desc[v] == 0:
-          unvisited_neighbor = v
-          break
-      if unvisited_neighbor:
-        desc[unvisited_neighbor] = 1
-        S.append(unvisited_neighbor)
-        R.append(unvisited_neighbor)
+    - max_depth: Optional limit on the depth of the DFS tree below 's'.
+
+    This function lazily yields the nodes in depth-first order starting from the given source node 's'.
+    With 'max_depth', a node reached again at a smaller depth is expanded again, so every node within
+    'max_depth' edges of 's' is yielded exactly once.
+    """
+    yielded = bytearray(self.num_nodes)
+    best = None if max_depth is None else array("I", [max_depth + 1]) * self.num_nodes
+    yielded[self.index[s]] = 1
+    if best is not None:
+      best[self.index[s]] = 0
+    S = [iter(self.adj[s])]
+    yield s
+    while S:
+      depth = len(S)
+      if max_depth is not None and depth > max_depth:
+        S.pop()
+        continue
+      for v in S[-1]:
+        i = self.index[v]
+        if best is None and yielded[i]:
+          continue
+        if best is not None:
+          if depth >= best[i]:
+            continue
+          best[i] = depth
+        S.append(iter(self.adj[v]))
+        if not yielded[i]:
+          yielded[i] = 1
+          yield v
+        break
       else:
         S.pop()
-    return R
 
-  def dfs_rec(self, s: Any) -> List[Any]:
+  def dfs_rec(self, s: Any, max_depth: Optional[int] = None) -> Iterator[Any]:
     """
     Perform Recursive Depth-First Search (DFS) starting from the specified source node.
 
     Parameters:
     - s: The source node for the recursive DFS traversal.
-
-    This function uses recursion to explore the graph in depth-first order starting from the given source node 's'.
-    """
-    desc = {}
-    for node in self.adj:
-      desc[node] = 0
-    R = []
-    self.dfs_rec_aux(s, desc, R)
-    return R
-
-  def dfs_rec_aux(self, u, desc, R):
-    desc[u] = 1
-    R.append(u)
+    - max_depth: Optional limit on the depth of the DFS tree below 's'.
+
+    This function uses recursion to lazily yield the nodes in depth-first order starting from the given source node 's'.
+    Nodes reached again at a smaller depth are expanded again, as in 'dfs'.
+    """
+    yielded = bytearray(self.num_nodes)
+    best = None if max_depth is None else array("I", [max_depth + 1]) * self.num_nodes
+    yield from self.dfs_rec_aux(s, yielded, best, 0, max_depth)
+
+  def dfs_rec_aux(self, u, yielded, best, depth, max_depth):
+    i = self.index[u]
+    if best is not None:
+      best[i] = depth
+    if not yielded[i]:
+      yielded[i] = 1
+      yield u
+    if max_depth is not None and depth >= max_depth:
+      return
     for v in self.adj[u]:
-      if desc[v] == 0:
-        self.dfs_rec_aux(v, desc, R)
+      if best is None:
+        if not yielded[self.index[v]]:
+          yield from self.dfs_rec_aux(v, yielded, best, depth + 1, max_depth)
+      elif depth + 1 < best[self.index[v]]:
+        yield from self.dfs_rec_aux(v, yielded, best, depth + 1, max_depth)
 
   def node_with_highest_degree_in(self) -> Any:    
     """
@@ -403,8 +425,8 @@ class Graph:
     if nodes[0] == nodes[-1]:
       # Path must not be a cycle
       return False    
-    visited_nodes = [nodes[0]]
-    visited_edges = []
+    visited_nodes = {nodes[0]}
+    visited_edges = set()
     for i in range(len(nodes) - 1):
       if not self.there_is_edge(nodes[i], nodes[i+1]):
         return False
@@ -414,8 +436,8 @@ class Graph:
       if (nodes[i], nodes[i+1]) in visited_edges or (nodes[i+1], nodes[i]) in visited_edges:
         # Edge was already used
         return False
-      visited_nodes.append(nodes[i+1])
-      visited_edges.append((nodes[i], nodes[i + 1]))
+      visited_nodes.add(nodes[i+1])
+      visited_edges.add((nodes[i], nodes[i + 1]))
     return True
 
   def is_trail(self, nodes: List[any]) -> bool:
@@ -431,14 +453,14 @@ class Graph:
     if nodes[0] == nodes[-1]:
       # Path must not be a cycle
       return False    
-    visited_edges = []
+    visited_edges = set()
     for i in range(len(nodes) - 1):
       if not self.there_is_edge(nodes[i], nodes[i+1]):
         return False
       if (nodes[i], nodes[i+1]) in visited_edges or (nodes[i+1], nodes[i]) in visited_edges:
         # Edge was already used
         return False
-      visited_edges.append((nodes[i], nodes[i + 1]))
+      visited_edges.add((nodes[i], nodes[i + 1]))
     return True
 
   def is_circuit(self, nodes: List[any]) -> bool:
@@ -454,14 +476,14 @@ class Graph:
     if nodes[0] != nodes[-1]:
       # Circuit must be closed
       return False    
-    visited_edges = []
+    visited_edges = set()
     for i in range(len(nodes) - 1):
       if not self.there_is_edge(nodes[i], nodes[i+1]):
         return False
       if (nodes[i], nodes[i+1]) in visited_edges or (nodes[i+1], nodes[i]) in visited_edges:
         # Edge was already used
         return False
-      visited_edges.append((nodes[i], nodes[i + 1]))
+      visited_edges.add((nodes[i], nodes[i + 1]))
     return True
 
   def is_cycle(self, nodes: List[any]) -> bool:
@@ -477,8 +499,8 @@ class Graph:
     if nodes[0] != nodes[-1]:
       # Cycle must be closed
       return False    
-    visited_nodes = [nodes[0]]
-    visited_edges = []
+    visited_nodes = {nodes[0]}
+    visited_edges = set()
     for i in range(len(nodes) - 1):
       if not self.there_is_edge(nodes[i], nodes[i+1]):
         return False
@@ -488,10 +510,37 @@ class Graph:
       if (nodes[i], nodes[i+1]) in visited_edges or (nodes[i+1], nodes[i]) in visited_edges:
         # Edge was already used
         return False
-      visited_nodes.append(nodes[i+1])
-      visited_edges.append((nodes[i], nodes[i + 1]))
+      visited_nodes.add(nodes[i+1])
+      visited_edges.add((nodes[i], nodes[i + 1]))
     return True
 
+  def validate_routes(self, routes: List[List[Any]], kind: str = "walk") -> List[bool]:
+    """
+    Check a batch of node sequences against this graph.
+
+    Each route is checked independently by the corresponding 'is_*' method; nothing is shared
+    between routes besides the lookup of the validator. Empty routes are reported as invalid.
+
+    Parameters:
+    - routes: List of node sequences.
+    - kind: One of "walk", "path", "trail", "circuit" or "cycle".
+
+    Returns:
+    A list with the result of the corresponding check for each route, in order.
+    """
+    validators = {
+      "walk": self.is_walk,
+      "path": self.is_path,
+      "trail": self.is_trail,
+      "circuit": self.is_circuit,
+      "cycle": self.is_cycle,
+    }
+    try:
+      validate = validators[kind]
+    except KeyError:
+      raise ValueError(f"unknown route kind: {kind}")
+    return [len(route) > 0 and validate(route) for route in routes]
+
   def is_connected(self) -> bool:
     """
     [Medium] Check if the graph is connected.
@@ -500,7 +549,7 @@ class Graph:
     True if the graph is connected, False otherwise.
     """
     first_node = list(self.adj.keys())[0]
-    return len(self.bfs(first_node)) == self.num_nodes
+    return sum(1 for _ in self.bfs(first_node)) == self.num_nodes
 
   def has_cycle(self) -> bool:
     """
@@ -580,6 +629,44 @@ class Graph:
     return (dist, pred)
 
 
+  def dijkstra_bounded(self, s, targets, allowed=None, limit=float("inf"), heuristic=None):
+    """
+    Run Dijkstra from 's' until the closest of 'targets' is settled.
+
+    Parameters:
+    - s: The source node.
+    - targets: Collection of target nodes; the search stops at the first one settled.
+    - allowed: Optional set of nodes the search may enter; None allows every node.
+    - limit: Only paths whose estimated total cost is strictly below this bound are explored.
+    - heuristic: Optional function giving a lower bound on the cost from a node to the closest target.
+      It must be consistent; the search then behaves as A*.
+
+    Returns:
+    A tuple (dist, pred, target) over the nodes reached, where target is the closest target found or None.
+    """
+    dist = {s: 0}
+    pred = {s: None}
+    Q = [(heuristic(s) if heuristic is not None else 0, 0, s)]
+    while Q:
+      _, dist_u, u = heapq.heappop(Q)
+      if dist_u > dist[u]:
+        continue
+      if u in targets:
+        return (dist, pred, u)
+      for v in self.adj[u]:
+        if allowed is not None and v not in allowed:
+          continue
+        dist_v = dist_u + self.adj[u][v]
+        if dist_v >= dist.get(v, float("inf")):
+          continue
+        priority = dist_v + heuristic(v) if heuristic is not None else dist_v
+        if priority < limit:
+          dist[v] = dist_v
+          heapq.heappush(Q, (priority, dist_v, v))
+          pred[v] = u
+    return (dist, pred, None)
+
+
   def bellman_ford_naive(self, s):
     dist = {node:float("inf") for node in self.adj}
     pred = {node:None for node in self.adj}
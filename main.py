@@ -1,6 +1,7 @@
 #Igor Marques Passos
 #22.2.8118
 
+import sys
 from manipulaBMP import MovimentacaoEquipamento
 
 # Função para interação com o usuário
@@ -19,8 +20,17 @@ def main():
     # Processa os arquivos bitmap na pasta
     movimentacao_equipamento.processar_bitmap(pasta_bitmap)
 
-    # Encontrar o caminho
-    caminho = movimentacao_equipamento.encontrar_caminho()
+    # Com --compacto, exibe a rota como segmentos retos em JSON
+    if "--compacto" in sys.argv[1:]:
+        rota = movimentacao_equipamento.encontrar_rota_compacta()
+        print(movimentacao_equipamento.serializar_rota_json(rota))
+        return
+
+    # Encontrar o caminho; com --piramide, busca do nível reduzido ao original
+    if "--piramide" in sys.argv[1:]:
+        caminho = movimentacao_equipamento.encontrar_caminho_piramide()
+    else:
+        caminho = movimentacao_equipamento.encontrar_caminho()
 
     # Exibe o caminho ao usuário
     print("É possível deslocar o equipamento:")
@@ -4,15 +4,40 @@ from os import listdir
 from typing import Tuple, List
 from os.path import isfile, join
 from queue import PriorityQueue
+import json
+import struct
 
 
 class MovimentacaoEquipamento:
+
+    # Direções dos segmentos retos no plano do andar: Norte, Sul, Leste, Oeste
+    DIRECOES = {(-1, 0): "N", (1, 0): "S", (0, 1): "L", (0, -1): "O"}
+    CODIGOS_DIRECAO = "NSLO"
+
+    # Formato binário: cabeçalho com o número de eventos, seguido dos eventos
+    # segmento: tipo, andar, linha, coluna, direção, comprimento
+    # andar:    tipo, andar de origem, andar de destino, linha, coluna
+    # parada:   tipo, andar, linha, coluna
+    FORMATO_CABECALHO = "<I"
+    FORMATO_SEGMENTO = "<BHIIBI"
+    FORMATO_ANDAR = "<BHHII"
+    FORMATO_PARADA = "<BHII"
+
+    # Cada nível da pirâmide agrupa FATOR_PIRAMIDE x FATOR_PIRAMIDE células do nível anterior
+    FATOR_PIRAMIDE = 2
+    TAMANHO_MINIMO_PIRAMIDE = 16
+    BANDA_MAXIMA = 4  # Alargamento máximo do corredor, em múltiplos da banda pedida
     
     def __init__(self):
         self.grafo = Graph()
         self.posicao_inicial = None
         self.posicoes_destino = []
         self.caminho = []
+        self.pasta = None
+        self.num_andares = 0
+        self.piramide = []  # Grades de custos de cada nível, começando pela resolução original
+        self.grafos_piramide = []  # Grafo de cada nível; o nível 0 é o próprio self.grafo
+        self.peso_minimo = 0  # Menor peso de aresta do grafo, usado pela heurística da busca exata
 
 # Processa o arquivo bitmap e constrói o grafo
     def processar_bitmap(self, pasta: str) -> None:
@@ -21,6 +46,8 @@ class MovimentacaoEquipamento:
 
         # Determina o número de andares com base nos arquivos presentes
         num_andares = len(arquivos)
+        self.pasta = pasta
+        self.num_andares = num_andares
 
         for andar in range(num_andares):
             arquivo_bitmap = f"{pasta}/toy_{andar}.bmp"
@@ -63,7 +90,7 @@ class MovimentacaoEquipamento:
 
                             
     
-    def encontrar_caminho(self) -> List[str]:
+    def calcular_caminho(self) -> List:
         # Utiliza o algoritmo de Dijkstra para encontrar o caminho mínimo
         distancias, predecessores = self.grafo.dijkstra(self.posicao_inicial)
 
@@ -71,9 +98,194 @@ class MovimentacaoEquipamento:
         posicao_destino = min(self.posicoes_destino, key=lambda destino: distancias[destino])
 
         # Reconstruir o caminho a partir dos predecessores
-        caminho = self.reconstruir_caminho(predecessores, posicao_destino)
+        return self.reconstruir_caminho(predecessores, posicao_destino)
+
+    def encontrar_caminho(self) -> List[str]:
+        return self.formatar_caminho(self.calcular_caminho())
+
+    # Rota vazia indica que nenhum destino é alcançável a partir da posição inicial
+    def encontrar_rota_compacta(self) -> List[Tuple]:
+        caminho = self.calcular_caminho()
+        if caminho[0] != self.posicao_inicial:
+            return []
+        return self.compactar_caminho(caminho)
+
+    # Relê os bitmaps e devolve o custo de cada pixel por andar; 0 indica parede
+    def ler_custos(self) -> List[List[bytearray]]:
+        custos = []
+        for andar in range(self.num_andares):
+            imagem = Image.open(f"{self.pasta}/toy_{andar}.bmp")
+            largura, altura = imagem.size
+            grade = []
+            for i in range(altura):
+                linha = bytearray(largura)
+                for j in range(largura):
+                    cor_pixel = imagem.getpixel((j, i))
+                    linha[j] = 0 if cor_pixel == (0, 0, 0) else 4 if cor_pixel == (128, 128, 128) else 2 if cor_pixel == (196, 196, 196) else 1
+                grade.append(linha)
+            custos.append(grade)
+        return custos
+
+    # Constrói a pirâmide de resoluções dos andares e o grafo de cada nível reduzido
+    def construir_piramide(self) -> None:
+        # A grade de custos só é lida quando a pirâmide é pedida
+        self.piramide = [self.ler_custos()]
+        self.grafos_piramide = [self.grafo]
+        self.peso_minimo = self.grafo.weakest_connection()[2]
+        if self.peso_minimo == float("inf"):
+            self.peso_minimo = 0
+
+        while True:
+            anterior = self.piramide[-1]
+            altura, largura = len(anterior[0]), len(anterior[0][0])
+            if min(altura, largura) < self.TAMANHO_MINIMO_PIRAMIDE * self.FATOR_PIRAMIDE:
+                break
+
+            nivel = len(self.piramide)
+            grades = [self.reduzir_grade(grade) for grade in anterior]
+            self.piramide.append(grades)
+            self.grafos_piramide.append(self.construir_grafo_nivel(grades, nivel))
+
+    # Uma célula reduzida só é transitável se todas as filhas forem, e herda o maior custo entre elas
+    def reduzir_grade(self, grade) -> List[bytearray]:
+        fator = self.FATOR_PIRAMIDE
+        altura, largura = len(grade), len(grade[0])
+        reduzida = []
+
+        for i in range(0, altura, fator):
+            linha = bytearray()
+            for j in range(0, largura, fator):
+                filhas = [grade[a][b] for a in range(i, min(i + fator, altura)) for b in range(j, min(j + fator, largura))]
+                linha.append(0 if 0 in filhas else max(filhas))
+            reduzida.append(linha)
+
+        return reduzida
+
+    def construir_grafo_nivel(self, grades, nivel: int) -> Graph:
+        grafo = Graph()
+        escala = self.FATOR_PIRAMIDE ** nivel
+
+        # A origem e os destinos permanecem no grafo mesmo quando a célula reduzida contém parede
+        forcadas = {self.ancestral(no, nivel) for no in [self.posicao_inicial] + self.posicoes_destino if no is not None}
+
+        def custo(andar, i, j):
+            valor = grades[andar][i][j]
+            if valor == 0 and (andar, i, j) in forcadas:
+                filhas = self.piramide[nivel - 1][andar]
+                valor = max(filhas[a][b] for a in range(i * self.FATOR_PIRAMIDE, min((i + 1) * self.FATOR_PIRAMIDE, len(filhas)))
+                            for b in range(j * self.FATOR_PIRAMIDE, min((j + 1) * self.FATOR_PIRAMIDE, len(filhas[0]))))
+            return valor
+
+        for andar, grade in enumerate(grades):
+            for i in range(len(grade)):
+                for j in range(len(grade[0])):
+                    custo_celula = custo(andar, i, j)
+                    if custo_celula == 0:
+                        continue
+                    grafo.add_node((andar, i, j))
+
+                    # Percorrer uma célula reduzida equivale a atravessar 'escala' pixels
+                    if i > 0 and custo(andar, i - 1, j) != 0:
+                        grafo.add_directed_edge((andar, i, j), (andar, i - 1, j), escala * custo(andar, i - 1, j))
+                        grafo.add_directed_edge((andar, i - 1, j), (andar, i, j), escala * custo_celula)
+                    if j > 0 and custo(andar, i, j - 1) != 0:
+                        grafo.add_directed_edge((andar, i, j), (andar, i, j - 1), escala * custo(andar, i, j - 1))
+                        grafo.add_directed_edge((andar, i, j - 1), (andar, i, j), escala * custo_celula)
+                    if andar > 0 and custo(andar - 1, i, j) != 0:
+                        grafo.add_undirected_edge((andar, i, j), (andar - 1, i, j), custo_celula)
+
+        return grafo
+
+    def ancestral(self, no, nivel: int) -> Tuple[int, int, int]:
+        andar, i, j = no
+        escala = self.FATOR_PIRAMIDE ** nivel
+        return (andar, i // escala, j // escala)
+
+    # Células do nível informado cujas células-mãe estão a até 'banda' células do caminho do nível acima
+    def corredor(self, caminho_superior, banda: int) -> set:
+        fator = self.FATOR_PIRAMIDE
+        vizinhanca = set()
+        for andar, i, j in caminho_superior:
+            for di in range(-banda, banda + 1):
+                for dj in range(-banda, banda + 1):
+                    vizinhanca.add((andar, i + di, j + dj))
+
+        permitidas = set()
+        for andar, i, j in vizinhanca:
+            for a in range(fator):
+                for b in range(fator):
+                    permitidas.add((andar, i * fator + a, j * fator + b))
+        return permitidas
+
+    # Limite inferior admissível para a busca na resolução original: cada aresta muda uma única
+    # coordenada (linha, coluna ou andar) em uma unidade e custa ao menos o menor peso do grafo
+    def heuristica_manhattan(self):
+        peso_minimo = self.peso_minimo
+        destinos = self.posicoes_destino
 
-        return self.formatar_caminho(caminho)
+        def estimativa(no):
+            andar, i, j = no
+            return peso_minimo * min(abs(andar - a) + abs(i - b) + abs(j - c) for a, b, c in destinos)
+        return estimativa
+
+    # Busca do nível mais reduzido ao original, refinando dentro de um corredor em volta do caminho anterior.
+    # Se o corredor não contém caminho, ele é alargado até BANDA_MAXIMA vezes; se ainda assim falhar,
+    # a busca recomeça sem corredor no nível seguinte.
+    # Com 'verificar', uma busca A* na resolução original garante que o resultado nunca é pior que o
+    # de Graph.dijkstra: ela só expande nós cuja estimativa de custo total fica estritamente abaixo do
+    # custo do corredor, o que costuma ser pouco quando a heurística é justa; no pior caso (paredes que
+    # obrigam grandes desvios) custa tanto quanto a busca exata.
+    def calcular_caminho_piramide(self, banda: int = 2, verificar: bool = True) -> List:
+        if not self.piramide:
+            self.construir_piramide()
+        heuristica = self.heuristica_manhattan()
+
+        caminho = None
+        restrito = False
+        for nivel in range(len(self.piramide) - 1, -1, -1):
+            grafo = self.grafos_piramide[nivel]
+            origem = self.ancestral(self.posicao_inicial, nivel)
+            destinos = {self.ancestral(destino, nivel) for destino in self.posicoes_destino}
+            estimativa = heuristica if nivel == 0 else None
+
+            if origem not in grafo.adj:
+                caminho = None
+                continue
+
+            largura = banda
+            while True:
+                permitidas = None if caminho is None else self.corredor(caminho, largura)
+                distancias, predecessores, destino = grafo.dijkstra_bounded(
+                    origem, destinos, permitidas, heuristic=estimativa)
+                if destino is not None or permitidas is None or largura >= banda * self.BANDA_MAXIMA:
+                    break
+                largura *= 2
+
+            restrito = permitidas is not None
+            caminho = None if destino is None else self.reconstruir_caminho(predecessores, destino)
+
+        if caminho is None and restrito:
+            # Nem o corredor alargado da resolução original contém caminho: busca exata sem corredor
+            distancias, predecessores, destino = self.grafo.dijkstra_bounded(
+                self.posicao_inicial, set(self.posicoes_destino), heuristic=heuristica)
+            restrito = False
+            caminho = None if destino is None else self.reconstruir_caminho(predecessores, destino)
+
+        if caminho is None:
+            # Nenhum destino é alcançável a partir da posição inicial
+            return [self.posicoes_destino[0]]
+
+        if verificar and restrito:
+            # Procura, na resolução original, um caminho estritamente mais barato que o do corredor
+            _, predecessores_exatos, destino_exato = self.grafo.dijkstra_bounded(
+                self.posicao_inicial, set(self.posicoes_destino), limit=distancias[destino], heuristic=heuristica)
+            if destino_exato is not None:
+                return self.reconstruir_caminho(predecessores_exatos, destino_exato)
+
+        return caminho
+
+    def encontrar_caminho_piramide(self, banda: int = 2, verificar: bool = True) -> List[str]:
+        return self.formatar_caminho(self.calcular_caminho_piramide(banda, verificar))
 
     def reconstruir_caminho(self, visitados, destino) -> List:
         caminho = [destino]
@@ -100,6 +312,86 @@ class MovimentacaoEquipamento:
 
         return caminho_formatado
 
+    # Agrupa o caminho em segmentos retos e mudanças de andar, em uma única passada
+    def compactar_caminho(self, caminho) -> List[Tuple]:
+        if len(caminho) == 1:
+            # Origem e destino coincidem: o equipamento não se move
+            return [("P",) + tuple(caminho[0])]
+
+        rota = []
+        aberto = None  # [andar, linha, coluna, direção, comprimento]
+
+        for anterior, atual in zip(caminho, caminho[1:]):
+            andar, i, j = anterior
+
+            if atual[0] != andar:
+                direcao = "C" if atual[0] > andar else "B"  # Sobe ou desce um andar
+            else:
+                direcao = self.DIRECOES[(atual[1] - i, atual[2] - j)]
+
+            if aberto is not None and aberto[3] == direcao:
+                aberto[4] += 1
+            else:
+                if aberto is not None:
+                    rota.append(self.fechar_evento(aberto))
+                aberto = [andar, i, j, direcao, 1]
+
+        if aberto is not None:
+            rota.append(self.fechar_evento(aberto))
+
+        return rota
+
+    def fechar_evento(self, aberto) -> Tuple:
+        andar, i, j, direcao, comprimento = aberto
+        if direcao == "C":
+            return ("A", andar, andar + comprimento, i, j)
+        if direcao == "B":
+            return ("A", andar, andar - comprimento, i, j)
+        return ("S", andar, i, j, direcao, comprimento)
+
+    # Serializa a rota compacta em JSON sem espaços
+    def serializar_rota_json(self, rota: List[Tuple]) -> str:
+        return json.dumps(rota, separators=(",", ":"))
+
+    # Serializa a rota compacta em registros binários de tamanho fixo
+    def serializar_rota_binaria(self, rota: List[Tuple]) -> bytes:
+        dados = [struct.pack(self.FORMATO_CABECALHO, len(rota))]
+
+        for evento in rota:
+            if evento[0] == "S":
+                _, andar, i, j, direcao, comprimento = evento
+                codigo = self.CODIGOS_DIRECAO.index(direcao)
+                dados.append(struct.pack(self.FORMATO_SEGMENTO, 0, andar, i, j, codigo, comprimento))
+            elif evento[0] == "P":
+                _, andar, i, j = evento
+                dados.append(struct.pack(self.FORMATO_PARADA, 2, andar, i, j))
+            else:
+                _, origem, destino, i, j = evento
+                dados.append(struct.pack(self.FORMATO_ANDAR, 1, origem, destino, i, j))
+
+        return b"".join(dados)
+
+    def desserializar_rota_binaria(self, dados: bytes) -> List[Tuple]:
+        (quantidade,) = struct.unpack_from(self.FORMATO_CABECALHO, dados, 0)
+        posicao = struct.calcsize(self.FORMATO_CABECALHO)
+        rota = []
+
+        for _ in range(quantidade):
+            if dados[posicao] == 0:
+                _, andar, i, j, codigo, comprimento = struct.unpack_from(self.FORMATO_SEGMENTO, dados, posicao)
+                rota.append(("S", andar, i, j, self.CODIGOS_DIRECAO[codigo], comprimento))
+                posicao += struct.calcsize(self.FORMATO_SEGMENTO)
+            elif dados[posicao] == 2:
+                _, andar, i, j = struct.unpack_from(self.FORMATO_PARADA, dados, posicao)
+                rota.append(("P", andar, i, j))
+                posicao += struct.calcsize(self.FORMATO_PARADA)
+            else:
+                _, origem, destino, i, j = struct.unpack_from(self.FORMATO_ANDAR, dados, posicao)
+                rota.append(("A", origem, destino, i, j))
+                posicao += struct.calcsize(self.FORMATO_ANDAR)
+
+        return rota
+
     def imprimir_caminho(self, caminho: List[str]) -> None:
         print("É possível deslocar o equipamento:")
         if len(caminho) == 1:
@@ -0,0 +1,308 @@
+#Servidor de rotas que mantém os prédios carregados em memória
+#Uso: python servidor.py [--porta 8080] [--memoria 512] [--trabalhadores 4]
+
+import asyncio
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import zlib
+from http import HTTPStatus
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit, parse_qs
+
+from manipulaBMP import MovimentacaoEquipamento
+
+
+# Estimativa grosseira do custo em memória de cada nó e aresta do grafo
+BYTES_POR_NO = 400
+BYTES_POR_ARESTA = 100
+
+# Tempo máximo, em segundos, para descartar o restante de uma requisição recusada
+TEMPO_DESCARTE = 1.0
+
+
+class CacheEdificios:
+
+    def __init__(self, limite_bytes: int):
+        self.limite_bytes = limite_bytes
+        self.edificios = OrderedDict()  # pasta -> (MovimentacaoEquipamento, bytes)
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.falhas = 0
+
+    def estimar_bytes(self, edificio: MovimentacaoEquipamento) -> int:
+        return edificio.grafo.num_nodes * BYTES_POR_NO + edificio.grafo.num_edges * BYTES_POR_ARESTA
+
+    def obter(self, pasta: str):
+        if pasta not in self.edificios:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        self.edificios.move_to_end(pasta)
+        return self.edificios[pasta][0]
+
+    def inserir(self, pasta: str, edificio: MovimentacaoEquipamento) -> None:
+        if pasta in self.edificios:
+            self.bytes_usados -= self.edificios.pop(pasta)[1]
+
+        tamanho = self.estimar_bytes(edificio)
+        self.edificios[pasta] = (edificio, tamanho)
+        self.bytes_usados += tamanho
+
+        # Descarta os prédios usados há mais tempo, mantendo sempre o mais recente
+        while self.bytes_usados > self.limite_bytes and len(self.edificios) > 1:
+            _, (_, liberado) = self.edificios.popitem(last=False)
+            self.bytes_usados -= liberado
+
+    def taxa_acerto(self) -> float:
+        total = self.acertos + self.falhas
+        return self.acertos / total if total else 0.0
+
+
+class EdificioInvalido(Exception):
+    pass
+
+
+class TrabalhadorInterrompido(Exception):
+    pass
+
+
+# Cache de prédios de cada processo trabalhador, criado por iniciar_trabalhador
+cache_trabalhador = None
+
+
+def iniciar_trabalhador(limite_bytes: int) -> None:
+    global cache_trabalhador
+    cache_trabalhador = CacheEdificios(limite_bytes)
+
+
+# Executada nos processos trabalhadores: só a pasta e o formato atravessam o processo
+def calcular_rota_trabalhador(pasta: str, formato: str):
+    edificio = cache_trabalhador.obter(pasta)
+    acerto = edificio is not None
+
+    if not acerto:
+        edificio = MovimentacaoEquipamento()
+        edificio.processar_bitmap(pasta)
+        if edificio.posicao_inicial is None:
+            raise EdificioInvalido("o prédio não tem posição inicial (pixel vermelho)")
+        if not edificio.posicoes_destino:
+            raise EdificioInvalido("o prédio não tem posição de destino (pixel verde)")
+        cache_trabalhador.inserir(pasta, edificio)
+
+    if formato == "compacto":
+        rota = edificio.encontrar_rota_compacta()
+    else:
+        rota = edificio.encontrar_caminho()
+
+    estado_cache = (cache_trabalhador.bytes_usados, len(cache_trabalhador.edificios))
+    return rota, acerto, estado_cache
+
+
+class ServidorRotas:
+
+    def __init__(self, limite_bytes: int, trabalhadores: int):
+        # Cada prédio é sempre atendido pelo mesmo trabalhador, então é carregado uma única vez;
+        # como os trabalhadores guardam prédios distintos, o limite de memória é dividido entre eles
+        self.limite_trabalhador = limite_bytes // trabalhadores
+        self.executores = [self.criar_executor() for _ in range(trabalhadores)]
+        self.vagas = [asyncio.Semaphore(1) for _ in range(trabalhadores)]
+        self.caches = {}  # índice do trabalhador -> (bytes usados, prédios em cache)
+        self.fila = 0  # Requisições aguardando o trabalhador do seu prédio
+        self.em_execucao = 0
+        self.requisicoes = 0
+        self.erros = 0
+        self.reinicios = 0  # Trabalhadores recriados após terminarem de forma abrupta
+        self.latencia_total = 0.0
+        self.latencia_maxima = 0.0
+        self.acertos = 0
+        self.falhas = 0
+
+    def criar_executor(self) -> ProcessPoolExecutor:
+        # 'spawn' evita que os trabalhadores herdem os sockets das conexões abertas
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=iniciar_trabalhador,
+            initargs=(self.limite_trabalhador,),
+        )
+
+    # Escolhe o trabalhador do prédio por um hash estável da pasta normalizada
+    def indice_trabalhador(self, pasta: str) -> int:
+        return zlib.crc32(pasta.encode("utf-8")) % len(self.executores)
+
+    # Envia a busca ao trabalhador do prédio; enquanto ele está ocupado, a requisição conta na fila
+    async def calcular_rota(self, pasta: str, formato: str):
+        indice = self.indice_trabalhador(pasta)
+
+        self.fila += 1
+        try:
+            await self.vagas[indice].acquire()
+        finally:
+            self.fila -= 1
+
+        self.em_execucao += 1
+        executor = self.executores[indice]
+        try:
+            rota, acerto, estado_cache = await asyncio.get_running_loop().run_in_executor(
+                executor, calcular_rota_trabalhador, pasta, formato)
+        except BrokenProcessPool:
+            self.reiniciar_trabalhador(indice, executor)
+            raise TrabalhadorInterrompido("o trabalhador terminou inesperadamente e foi reiniciado")
+        finally:
+            self.em_execucao -= 1
+            self.vagas[indice].release()
+
+        if acerto:
+            self.acertos += 1
+        else:
+            self.falhas += 1
+        self.caches[indice] = estado_cache
+        return rota
+
+    # Substitui o executor cujo processo morreu (por exemplo, pelo OOM killer); o cache dele se perde
+    def reiniciar_trabalhador(self, indice: int, executor: ProcessPoolExecutor) -> None:
+        if self.executores[indice] is not executor:
+            return  # Outra requisição do mesmo trabalhador já o recriou
+        executor.shutdown(wait=False)
+        self.executores[indice] = self.criar_executor()
+        self.caches.pop(indice, None)
+        self.reinicios += 1
+
+    def metricas(self) -> dict:
+        total_cache = self.acertos + self.falhas
+        return {
+            "requisicoes": self.requisicoes,
+            "erros": self.erros,
+            "reinicios_trabalhadores": self.reinicios,
+            "latencia_media_ms": 1000 * self.latencia_total / self.requisicoes if self.requisicoes else 0.0,
+            "latencia_maxima_ms": 1000 * self.latencia_maxima,
+            "fila": self.fila,
+            "em_execucao": self.em_execucao,
+            "cache_acertos": self.acertos,
+            "cache_falhas": self.falhas,
+            "cache_taxa_acerto": self.acertos / total_cache if total_cache else 0.0,
+            "cache_edificios": sum(edificios for _, edificios in self.caches.values()),
+            "cache_bytes": sum(usados for usados, _ in self.caches.values()),
+        }
+
+    async def responder(self, metodo: str, alvo: str):
+        url = urlsplit(alvo)
+        parametros = parse_qs(url.query)
+
+        if metodo != "GET":
+            return 405, {"erro": "método não suportado"}
+
+        if url.path == "/metricas":
+            return 200, self.metricas()
+
+        if url.path == "/rota":
+            if "pasta" not in parametros:
+                return 400, {"erro": "parâmetro 'pasta' é obrigatório"}
+            formato = parametros.get("formato", ["setas"])[0]
+            if formato not in ("setas", "compacto"):
+                return 400, {"erro": "formato deve ser 'setas' ou 'compacto'"}
+
+            # Normaliza a pasta para que 'toy' e 'toy/' compartilhem a mesma entrada do cache
+            pasta = os.path.realpath(parametros["pasta"][0])
+
+            inicio = time.perf_counter()
+            try:
+                rota = await self.calcular_rota(pasta, formato)
+                status, corpo = 200, {"rota": rota}
+            except OSError as erro:
+                status, corpo = 404, {"erro": str(erro)}
+            except EdificioInvalido as erro:
+                status, corpo = 422, {"erro": str(erro)}
+            except TrabalhadorInterrompido as erro:
+                status, corpo = 503, {"erro": str(erro)}
+            except Exception as erro:
+                status, corpo = 500, {"erro": str(erro)}
+            latencia = time.perf_counter() - inicio
+
+            self.requisicoes += 1
+            if status != 200:
+                self.erros += 1
+            self.latencia_total += latencia
+            self.latencia_maxima = max(self.latencia_maxima, latencia)
+            corpo["latencia_ms"] = 1000 * latencia
+            return status, corpo
+
+        return 404, {"erro": "caminho desconhecido"}
+
+    async def descartar_entrada(self, leitor) -> None:
+        while await leitor.read(65536):
+            pass
+
+    # Atende uma conexão HTTP/1.0 simples: uma requisição por conexão
+    async def atender(self, leitor, escritor) -> None:
+        try:
+            try:
+                linha = await leitor.readline()
+                while (await leitor.readline()) not in (b"\r\n", b"\n", b""):
+                    pass  # Ignora os cabeçalhos
+            except (ValueError, asyncio.LimitOverrunError):
+                # Linha de requisição ou de cabeçalho maior que o limite do leitor
+                linha = None
+
+            if linha is None:
+                status, corpo = 400, {"erro": "linha da requisição ou cabeçalho longo demais"}
+            else:
+                partes = linha.decode("latin-1").split(" ", 2)
+                if len(partes) != 3:
+                    status, corpo = 400, {"erro": "requisição inválida"}
+                else:
+                    try:
+                        status, corpo = await self.responder(partes[0], partes[1])
+                    except Exception as erro:
+                        status, corpo = 500, {"erro": str(erro)}
+
+            dados = json.dumps(corpo, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            escritor.write(
+                f"HTTP/1.0 {status} {HTTPStatus(status).phrase}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(dados)}\r\n\r\n".encode("latin-1") + dados
+            )
+            await escritor.drain()
+
+            if linha is None:
+                # Descarta o restante da requisição antes de fechar, para que o cliente
+                # receba a resposta em vez de um reset da conexão
+                escritor.write_eof()
+                await asyncio.wait_for(self.descartar_entrada(leitor), TEMPO_DESCARTE)
+        except (ConnectionError, asyncio.TimeoutError):
+            pass  # O cliente encerrou a conexão; não há a quem responder
+        finally:
+            escritor.close()
+
+    async def iniciar(self, host: str, porta: int) -> None:
+        servidor = await asyncio.start_server(self.atender, host, porta)
+        print(f"Servindo rotas em http://{host}:{porta}")
+        async with servidor:
+            await servidor.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de rotas para movimentação de equipamentos")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--memoria", type=int, default=512, help="limite total do cache de prédios em MB, dividido entre os trabalhadores")
+    parser.add_argument("--trabalhadores", type=int, default=4, help="número de processos trabalhadores")
+    argumentos = parser.parse_args()
+
+    servidor = ServidorRotas(argumentos.memoria * 1024 * 1024, argumentos.trabalhadores)
+    try:
+        asyncio.run(servidor.iniciar(argumentos.host, argumentos.porta))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for executor in servidor.executores:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()